@@ -1,11 +1,18 @@
 import asyncio
+import contextlib
+import functools
 import json
 import os
+import sys
 import hashlib
 import time
 import tempfile
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import List, Dict, NamedTuple, Optional, Tuple
 from urllib.parse import urljoin, quote, urlparse
+import aiofiles
 import aiohttp
 
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
@@ -16,55 +23,362 @@ from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 from astrbot.api.event.filter import CustomFilter
 from astrbot.core.config import AstrBotConfig
 
+# 优先使用 orjson 加速JSON编解码，未安装时回退到标准库
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+
+except ImportError:
+
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+# 流式上传时每次读取的块大小；小于 SMALL_UPLOAD_SIZE 的文件直接整体读入后上传
+UPLOAD_CHUNK_SIZE = 1 << 20
+SMALL_UPLOAD_SIZE = 4 << 20
+
+# 下载时每次从响应读取的块大小，以及进度汇报间隔
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_PROGRESS_STEP = 10 * 1024 * 1024
+
+# 同时进行的Alist API请求数上限（默认值）
+DEFAULT_MAX_CONCURRENT_API_CALLS = 16
+
+# 用户可通过 /alist config set 修改的配置项
+_CONFIG_KEY_ORDER = ("alist_url", "username", "password", "token", "max_display_files")
+_VALID_CONFIG_KEYS = frozenset(_CONFIG_KEY_ORDER)
+_VALID_CONFIG_KEYS_STR = ", ".join(_CONFIG_KEY_ORDER)
+# 显示配置时需要隐藏的敏感项
+_SECRET_CONFIG_KEYS = frozenset({"password", "token"})
+
+# 可上传的消息组件类型
+_UPLOAD_TYPES = (File, Image)
+
+# 上传图片时保留原扩展名的图片类型
+_IMG_EXTS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp"})
+
+# 文件列表图标
+_DIR_ICON = "📂"
+_DEFAULT_FILE_ICON = "📄"
+_EXT_ICON = {
+    ".jpg": "🖼️",
+    ".jpeg": "🖼️",
+    ".png": "🖼️",
+    ".gif": "🖼️",
+    ".bmp": "🖼️",
+    ".mp4": "🎬",
+    ".avi": "🎬",
+    ".mkv": "🎬",
+    ".mov": "🎬",
+    ".mp3": "🎵",
+    ".wav": "🎵",
+    ".flac": "🎵",
+    ".aac": "🎵",
+    ".pdf": "📄",
+    ".doc": "📝",
+    ".docx": "📝",
+    ".zip": "📦",
+    ".rar": "📦",
+    ".7z": "📦",
+}
+
+
+# Alist客户端缓存的容量和闲置淘汰时间(秒)
+CLIENT_CACHE_SIZE = 64
+CLIENT_IDLE_TTL = 1800
+
+# 内存缓存最多保留的目录列表条目数
+MEM_CACHE_SIZE = 256
+
+# 上传模式无操作后自动取消的时间（秒）
+UPLOAD_WAIT_TIMEOUT = 600
+
+# 文件大小单位
+_KB, _MB, _GB = 1 << 10, 1 << 20, 1 << 30
+_ZERO_SIZE = "0B"
+
+# 帮助文本（静态部分在导入时构造，调用时只拼接与配置相关的段落）
+_HELP_BASE = """📚 Alist文件管理插件帮助
+
+🔧 配置命令:
+/alist config show - 显示当前配置
+/alist config setup - 快速配置向导
+/alist config set <key> <value> - 设置配置项
+/alist config test - 测试连接
+/alist config clear_cache - 清理文件缓存
+
+📁 智能导航:
+/alist ls [路径] - 列出文件和目录 (带序号)
+/alist ls <序号> - 进入对应项目或下载文件
+/alist quit - 返回上级目录
+
+🔍 文件操作:
+/alist search <关键词> [路径] - 搜索文件
+/alist info <文件路径> - 查看文件详细信息
+/alist download <路径/序号> - 获取下载链接或直接下载
+
+📤 上传操作:
+/alist upload - 开始上传模式
+/alist upload cancel - 取消上传模式
+(在上传模式下直接发送文件或图片即可上传)
+
+📝 示例:
+/alist config setup (推荐新手使用)
+/alist config set alist_url http://localhost:5244
+/alist ls /movies
+/alist ls 1 (进入1号目录或下载1号文件)
+/alist quit (返回上级目录)
+/alist search movie.mp4
+/alist download 3 (直接下载3号文件)"""
+
+_HELP_USER_AUTH_SUFFIX = """
+
+👤 用户认证模式:
+- 当前启用了用户独立配置模式
+- 每个用户需要独立配置自己的Alist连接
+- 您的配置不会影响其他用户"""
+
+_HELP_UNCONFIGURED_WARN = """
+
+⚠️  您尚未配置Alist连接，请使用以下命令开始:
+   /alist config setup"""
+
+_HELP_GLOBAL_SUFFIX = """
+
+🌐 全局配置模式:
+- 当前使用全局配置模式
+- 所有用户共享相同的Alist服务器连接
+- 管理员可在WebUI中配置全局设置"""
+
+_HELP_TIP = """
+
+💡 提示:
+1. 首次使用建议运行 /alist config setup 配置向导
+2. 如果Alist需要登录，请配置用户名和密码
+3. 路径区分大小写，以/开头表示根目录
+4. 管理员可在WebUI插件配置页面调整全局设置"""
+
+# 上传模式提示模板
+_UPLOAD_MODE_TEMPLATE = """📤 上传模式已启动
+
+📂 目标目录: {path}
+
+💡 请直接发送文件或图片，系统会自动上传到此目录
+⏰ 上传模式将在10分钟后自动取消
+
+📋 支持的操作:
+• 直接发送文件 - 上传文件
+• 直接发送图片 - 上传图片
+• /alist upload cancel - 取消上传模式
+• /alist ls - 查看当前目录"""
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_size(size: int) -> str:
+    """格式化文件大小（同一目录反复渲染时命中缓存）"""
+    if size < _KB:
+        return f"{size}B"
+    if size < _MB:
+        return f"{size / _KB:.1f}KB"
+    if size < _GB:
+        return f"{size / _MB:.1f}MB"
+    return f"{size / _GB:.1f}GB"
+
+
+@functools.lru_cache(maxsize=2048)
+def _quote_path(path: str) -> str:
+    """URL编码Alist路径（保留/），浏览时同一路径会被反复编码"""
+    return quote(path.encode("utf-8"), safe="/")
+
+
+def _mask(key: str, value):
+    """隐藏敏感配置项的值"""
+    return "***" if value and key in _SECRET_CONFIG_KEYS else value
+
+
+def _strip_trailing_slash(path: str) -> str:
+    """去掉路径末尾的/（根目录除外），已标准化的路径原样返回"""
+    return path[:-1] if len(path) > 1 and path.endswith("/") else path
+
+
+def _parse_index(path: str) -> Optional[int]:
+    """把参数解析为序号，不是纯数字时返回None
+
+    只接受十进制数字（isdecimal），"-1"、"+1"、" 1"、"1_000" 等仍按路径处理；
+    isdecimal 通过的字符串 int() 必定能解析，无需再捕获异常。
+    """
+    return int(path) if path.isdecimal() else None
+
+
+class Credentials(NamedTuple):
+    """Alist连接凭据，同时作为客户端缓存的键"""
+
+    alist_url: str
+    username: str
+    password: str
+    token: str
+
+
+def _credentials_for(user_config: Dict) -> Credentials:
+    """从用户配置中取出连接凭据"""
+    return Credentials(
+        user_config["alist_url"],
+        user_config.get("username", ""),
+        user_config.get("password", ""),
+        user_config.get("token", ""),
+    )
+
+
+@dataclass(slots=True)
+class NavState:
+    """用户导航状态"""
+
+    current_path: str = "/"
+    items: List[Dict] = field(default_factory=list)
+    parent_paths: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class UploadState:
+    """用户上传状态"""
+
+    waiting: bool = False
+    target_path: str = "/"
+
 
 class FileUploadFilter(CustomFilter):
     """文件上传自定义过滤器 - 处理包含文件或图片的消息"""
 
     def filter(self, event: AstrMessageEvent, cfg: AstrBotConfig) -> bool:
         """检查消息是否包含文件或图片组件"""
-        messages = event.get_messages()
-        file_components = [msg for msg in messages if isinstance(msg, (File, Image))]
-        return len(file_components) > 0
+        return any(isinstance(msg, _UPLOAD_TYPES) for msg in event.get_messages())
+
+
+async def _read_file_bytes(file_path: str) -> bytes:
+    """整体读取文件内容"""
+    async with aiofiles.open(file_path, "rb") as f:
+        return await f.read()
+
+
+class _FilePayload(aiohttp.Payload):
+    """从磁盘分块读取的请求体，避免将整个文件载入内存
+
+    通过 size 告知 aiohttp 文件长度，使其发送 Content-Length 而不是 chunked 编码。
+    """
+
+    def __init__(self, file_path: str, size: Optional[int] = None, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._size = os.path.getsize(file_path) if size is None else size
+
+    async def write(self, writer):
+        async with aiofiles.open(self._value, "rb") as f:
+            while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+                await writer.write(chunk)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        raise TypeError("文件请求体无法解码为字符串")
 
 
 class AlistClient:
     """Alist API 客户端"""
 
     def __init__(
-        self, base_url: str, username: str = "", password: str = "", token: str = ""
+        self,
+        base_url: str,
+        username: str = "",
+        password: str = "",
+        token: str = "",
+        session: aiohttp.ClientSession = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.username = username
         self.password = password
         self.token = token
-        self.session = None
-
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
-        if not self.token and self.username and self.password:
-            await self.login()
-        return self
+        # 由插件统一持有的长连接会话，客户端本身不负责关闭
+        self.session = session
+        # 插件级并发限制，所有客户端共享
+        self._sem = semaphore or asyncio.Semaphore(DEFAULT_MAX_CONCURRENT_API_CALLS)
+        # 客户端会被插件缓存复用，登录需串行化，避免并发命令重复登录
+        self._login_lock = asyncio.Lock()
+
+    def _can_login(self) -> bool:
+        return bool(self.username and self.password)
+
+    async def _ensure_login(self):
+        """需要认证的请求前确保已登录（已有token时直接返回）"""
+        if self.token or not self._can_login():
+            return
+        async with self._login_lock:
+            if not self.token:
+                await self.login()
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+    async def _relogin(self, stale_token: str) -> bool:
+        """token失效时重新登录，返回是否可以用新token重试"""
+        if not self._can_login():
+            return False
+        async with self._login_lock:
+            # 其他请求已经刷新过token时直接复用
+            if self.token != stale_token:
+                return bool(self.token)
+            self.token = ""
+            return await self.login()
+
+    async def _post_json(self, endpoint: str, payload: Dict) -> Optional[Dict]:
+        """向Alist发送JSON API请求，成功(code=200)时返回完整响应体
+
+        所有控制类接口都经由此方法，在共享会话的长连接上复用同一组连接。
+        缓存的客户端token过期(code=401)时会重新登录并重试一次。
+        """
+        for attempt in range(2):
+            token = self.token
+            headers = {}
+            if token:
+                headers["Authorization"] = token
+
+            async with self._sem:
+                async with self.session.post(
+                    f"{self.base_url}{endpoint}", json=payload, headers=headers
+                ) as resp:
+                    if resp.status != 200:
+                        return None
+                    result = _json_loads(await resp.read())
+
+            code = result.get("code")
+            if code == 200:
+                return result
+            if (
+                code == 401
+                and token
+                and attempt == 0
+                and endpoint != "/api/auth/login"
+                and await self._relogin(token)
+            ):
+                continue
+            return None
+        return None
 
     async def login(self) -> bool:
         """登录获取token"""
         try:
             login_data = {"username": self.username, "password": self.password}
 
-            async with self.session.post(
-                f"{self.base_url}/api/auth/login", json=login_data
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("code") == 200:
-                        self.token = result.get("data", {}).get("token", "")
-                        return True
-                return False
+            result = await self._post_json("/api/auth/login", login_data)
+            if result is not None:
+                self.token = result.get("data", {}).get("token", "")
+                return True
+            return False
         except Exception as e:
-            logger.error(f"Alist登录失败: {e}")
+            logger.error("Alist登录失败: %s", e)
             return False
 
     async def list_files(
@@ -72,10 +386,7 @@ class AlistClient:
     ) -> Optional[Dict]:
         """获取文件列表"""
         try:
-            headers = {}
-            if self.token:
-                headers["Authorization"] = self.token
-
+            await self._ensure_login()
             list_data = {
                 "path": path,
                 "password": "",
@@ -84,46 +395,28 @@ class AlistClient:
                 "refresh": False,
             }
 
-            async with self.session.post(
-                f"{self.base_url}/api/fs/list", json=list_data, headers=headers
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("code") == 200:
-                        return result.get("data")
-                return None
+            result = await self._post_json("/api/fs/list", list_data)
+            return result.get("data") if result is not None else None
         except Exception as e:
-            logger.error(f"获取文件列表失败: {e}")
+            logger.error("获取文件列表失败: %s", e)
             return None
 
     async def get_file_info(self, path: str) -> Optional[Dict]:
         """获取文件信息"""
         try:
-            headers = {}
-            if self.token:
-                headers["Authorization"] = self.token
-
+            await self._ensure_login()
             get_data = {"path": path, "password": ""}
 
-            async with self.session.post(
-                f"{self.base_url}/api/fs/get", json=get_data, headers=headers
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("code") == 200:
-                        return result.get("data")
-                return None
+            result = await self._post_json("/api/fs/get", get_data)
+            return result.get("data") if result is not None else None
         except Exception as e:
-            logger.error(f"获取文件信息失败: {e}")
+            logger.error("获取文件信息失败: %s", e)
             return None
 
     async def search_files(self, keyword: str, path: str = "/") -> Optional[List[Dict]]:
         """搜索文件"""
         try:
-            headers = {}
-            if self.token:
-                headers["Authorization"] = self.token
-
+            await self._ensure_login()
             search_data = {
                 "parent": path,
                 "keywords": keyword,
@@ -132,29 +425,31 @@ class AlistClient:
                 "per_page": 100,
             }
 
-            async with self.session.post(
-                f"{self.base_url}/api/fs/search", json=search_data, headers=headers
-            ) as resp:
-                if resp.status == 200:
-                    result = await resp.json()
-                    if result.get("code") == 200:
-                        return result.get("data", {}).get("content", [])
-                return []
+            result = await self._post_json("/api/fs/search", search_data)
+            if result is not None:
+                return result.get("data", {}).get("content", [])
+            return []
         except Exception as e:
-            logger.error(f"搜索文件失败: {e}")
+            logger.error("搜索文件失败: %s", e)
             return []
 
+    def build_download_url(self, path: str) -> str:
+        """根据文件路径构建下载链接（不请求服务器，调用方需确认是文件）"""
+        return f"{self.base_url}/d{_quote_path(path)}"
+
     async def get_download_url(self, path: str) -> Optional[str]:
         """获取文件下载链接"""
         file_info = await self.get_file_info(path)
         if file_info and not file_info.get("is_dir", True):
-            # 构建下载链接
-            encoded_path = quote(path.encode("utf-8"))
-            return f"{self.base_url}/d{encoded_path}"
+            return self.build_download_url(path)
         return None
 
     async def upload_file(
-        self, file_path: str, target_path: str, filename: str = None
+        self,
+        file_path: str,
+        target_path: str,
+        filename: str = None,
+        file_size: Optional[int] = None,
     ) -> bool:
         """上传文件到Alist
 
@@ -162,50 +457,118 @@ class AlistClient:
             file_path: 本地文件路径
             target_path: 目标目录路径
             filename: 目标文件名（可选，默认使用原文件名）
+            file_size: 文件大小（可选，调用方已stat过时传入，避免重复stat）
 
         Returns:
             bool: 上传是否成功
         """
         try:
-            if not os.path.exists(file_path):
-                logger.error(f"文件不存在: {file_path}")
-                return False
+            if file_size is None:
+                try:
+                    file_size = os.stat(file_path).st_size
+                except FileNotFoundError:
+                    logger.error("文件不存在: %s", file_path)
+                    return False
 
             if filename is None:
                 filename = os.path.basename(file_path)
 
+            await self._ensure_login()
+
             # 构造上传URL
             upload_url = f"{self.base_url}/api/fs/put"
 
-            # 准备上传数据
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-
-            # 构造请求头
-            headers = {
-                "Content-Type": "application/octet-stream",
-                "File-Path": quote(f"{target_path.rstrip('/')}/{filename}", safe="/"),
-            }
+            file_path_header = _quote_path(f"{target_path.rstrip('/')}/{filename}")
 
-            # 如果有token，添加授权头
-            if hasattr(self, "token") and self.token:
-                headers["Authorization"] = self.token
-
-            async with self.session.put(
-                upload_url, data=file_data, headers=headers
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return result.get("code") == 200
+            for attempt in range(2):
+                # 小文件一次性读入内存直接发送，大文件分块流式发送
+                if file_size < SMALL_UPLOAD_SIZE:
+                    data = await _read_file_bytes(file_path)
                 else:
-                    logger.error(f"上传失败，HTTP状态: {response.status}")
-                    return False
+                    data = _FilePayload(file_path, size=file_size)
+
+                # 构造请求头（显式指定长度，避免退化为 chunked 传输）
+                token = self.token
+                headers = {
+                    "Content-Type": "application/octet-stream",
+                    "Content-Length": str(file_size),
+                    "File-Path": file_path_header,
+                }
+
+                # 如果有token，添加授权头
+                if token:
+                    headers["Authorization"] = token
+
+                async with self._sem:
+                    async with self.session.put(
+                        upload_url, data=data, headers=headers
+                    ) as response:
+                        if response.status != 200:
+                            logger.error("上传失败，HTTP状态: %s", response.status)
+                            return False
+                        result = _json_loads(await response.read())
+
+                # token过期时重新登录后重试一次
+                if (
+                    result.get("code") == 401
+                    and token
+                    and attempt == 0
+                    and await self._relogin(token)
+                ):
+                    continue
+                return result.get("code") == 200
+            return False
 
         except Exception as e:
-            logger.error(f"上传文件失败: {e}")
+            logger.error("上传文件失败: %s", e)
             return False
 
 
+# 配置文件内存缓存 {文件路径: (mtime_ns, 配置内容)}，文件未变化时不再读盘解析
+_CONFIG_CACHE: Dict[str, Tuple[int, Dict]] = {}
+
+
+def _read_json_cached(config_file: str) -> Optional[Dict]:
+    """读取JSON配置文件，按修改时间缓存解析结果；文件不存在时返回None"""
+    try:
+        mtime_ns = os.stat(config_file).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    entry = _CONFIG_CACHE.get(config_file)
+    if entry and entry[0] == mtime_ns:
+        return entry[1]
+
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = _json_loads(f.read())
+    _CONFIG_CACHE[config_file] = (mtime_ns, config)
+    return config
+
+
+def _remember_json(config_file: str, config: Dict):
+    """写入配置文件后同步更新缓存，下一次读取无需再读盘"""
+    try:
+        _CONFIG_CACHE[config_file] = (os.stat(config_file).st_mtime_ns, dict(config))
+    except OSError:
+        _CONFIG_CACHE.pop(config_file, None)
+
+
+def _write_json_atomic(config_file: str, config: Dict):
+    """先写入同目录下的临时文件再替换目标文件，并发读取时不会读到写了一半的内容"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(config_file), prefix=".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(_json_dumps(config))
+        os.replace(tmp_path, config_file)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    _remember_json(config_file, config)
+
+
 class UserConfigManager:
     """用户配置管理器 - 每个用户独立配置"""
 
@@ -218,6 +581,8 @@ class UserConfigManager:
         )
         os.makedirs(self.config_dir, exist_ok=True)
         self.config_file = os.path.join(self.config_dir, f"{user_id}.json")
+        # 串行化“读取-修改-保存”，并发的 config set 不会互相覆盖
+        self._update_lock = threading.Lock()
         self.default_config = {
             "alist_url": "",
             "username": "",
@@ -244,25 +609,39 @@ class UserConfigManager:
     def load_config(self) -> Dict:
         """加载用户配置"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    config = json.load(f)
+            config = _read_json_cached(self.config_file)
+            if config is not None:
                 # 合并默认配置
                 merged_config = self.default_config.copy()
                 merged_config.update(config)
                 return merged_config
             return self.default_config.copy()
         except Exception as e:
-            logger.error(f"加载用户 {self.user_id} 配置失败: {e}")
+            logger.error("加载用户 %s 配置失败: %s", self.user_id, e)
             return self.default_config.copy()
 
     def save_config(self, config: Dict):
         """保存用户配置"""
         try:
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            _write_json_atomic(self.config_file, config)
         except Exception as e:
-            logger.error(f"保存用户 {self.user_id} 配置失败: {e}")
+            logger.error("保存用户 %s 配置失败: %s", self.user_id, e)
+
+    async def load_config_async(self) -> Dict:
+        """在线程池中加载配置，避免阻塞事件循环"""
+        return await asyncio.to_thread(self.load_config)
+
+    def update_config(self, updates: Dict) -> Dict:
+        """在锁内完成读取、修改、保存，返回更新后的配置"""
+        with self._update_lock:
+            config = self.load_config()
+            config.update(updates)
+            self.save_config(config)
+            return config
+
+    async def update_config_async(self, updates: Dict) -> Dict:
+        """在线程池中更新配置，整个读取-修改-保存过程只占用一次线程调用"""
+        return await asyncio.to_thread(self.update_config, updates)
 
     def is_configured(self) -> bool:
         """检查用户是否已配置"""
@@ -281,79 +660,200 @@ class CacheManager:
         )
         os.makedirs(self.cache_dir, exist_ok=True)
 
+        # 一级内存缓存 {(url, path, user_id): (写入时间, 数据)}，按LRU淘汰，
+        # 未命中时才计算摘要并回落到磁盘
+        self._mem_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict]]" = (
+            OrderedDict()
+        )
+        # 正在后台执行的磁盘写入/删除任务（保持引用，防止被回收）
+        self._pending_writes = set()
+        # 每个缓存文件最近一次提交的磁盘操作，后续操作排在其后，保证写入/删除按顺序生效
+        self._disk_ops: Dict[str, asyncio.Task] = {}
+
+    def _get_user_prefix(self, user_id: str) -> str:
+        """生成用户缓存前缀（8位十六进制），用于按用户清理缓存"""
+        return hashlib.blake2b(user_id.encode("utf-8"), digest_size=4).hexdigest()
+
     def _get_cache_key(self, url: str, path: str, user_id: str) -> str:
-        """生成缓存键"""
-        content = f"{url}:{path}:{user_id}"
-        return hashlib.md5(content.encode("utf-8")).hexdigest()
+        """生成磁盘缓存键，格式为 <用户前缀>_<摘要>"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(url.encode("utf-8"))
+        h.update(b":")
+        h.update(path.encode("utf-8"))
+        h.update(b":")
+        h.update(user_id.encode("utf-8"))
+        return f"{self._get_user_prefix(user_id)}_{h.hexdigest()}"
 
     def _get_cache_file(self, cache_key: str) -> str:
         """获取缓存文件路径"""
         return os.path.join(self.cache_dir, f"{cache_key}.json")
 
-    def get_cache(
-        self, url: str, path: str, user_id: str, max_age: int = 300
-    ) -> Optional[Dict]:
-        """获取缓存"""
+    def _mem_put(self, mem_key: Tuple[str, str, str], timestamp: float, data: Dict):
+        """写入内存缓存，超出容量时淘汰最久未使用的条目"""
+        self._mem_cache[mem_key] = (timestamp, data)
+        self._mem_cache.move_to_end(mem_key)
+        while len(self._mem_cache) > MEM_CACHE_SIZE:
+            self._mem_cache.popitem(last=False)
+
+    def _write_disk(self, cache_file: str, cache_data: Dict):
+        """将缓存写入磁盘"""
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                f.write(_json_dumps(cache_data))
+        except Exception as e:
+            logger.debug("写入缓存失败: %s", e)
+
+    def _remove_disk(self, cache_file: str):
+        """删除磁盘缓存文件"""
+        with contextlib.suppress(OSError):
+            os.unlink(cache_file)
+
+    def _schedule_disk(self, cache_file: str, func, *args):
+        """在线程池中后台执行磁盘操作，同一缓存文件的操作按提交顺序串行执行
+
+        没有运行中的事件循环时直接同步执行。
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            func(cache_file, *args)
+            return
+
+        prev = self._disk_ops.get(cache_file)
+
+        async def run():
+            if prev is not None and not prev.done():
+                await asyncio.wait((prev,))
+            await asyncio.to_thread(func, cache_file, *args)
+
+        task = loop.create_task(run())
+        self._disk_ops[cache_file] = task
+        self._pending_writes.add(task)
+
+        def done(t: asyncio.Task):
+            self._pending_writes.discard(t)
+            if self._disk_ops.get(cache_file) is t:
+                del self._disk_ops[cache_file]
+
+        task.add_done_callback(done)
+
+    def _mem_get(self, mem_key: Tuple[str, str, str], max_age: int) -> Optional[Dict]:
+        """从内存缓存读取，过期条目直接丢弃"""
+        entry = self._mem_cache.get(mem_key)
+        if entry:
+            if time.time() - entry[0] < max_age:
+                self._mem_cache.move_to_end(mem_key)
+                return entry[1]
+            del self._mem_cache[mem_key]
+        return None
+
+    def _disk_get(self, cache_key: str, max_age: int) -> Optional[Tuple[float, Dict]]:
+        """从磁盘读取缓存，返回 (写入时间, 数据)；只做文件IO，可在线程池中执行"""
         try:
-            cache_key = self._get_cache_key(url, path, user_id)
             cache_file = self._get_cache_file(cache_key)
 
-            if not os.path.exists(cache_file):
+            try:
+                mtime = os.stat(cache_file).st_mtime
+            except FileNotFoundError:
                 return None
 
             # 检查缓存是否过期
-            if time.time() - os.path.getmtime(cache_file) > max_age:
-                try:
-                    os.remove(cache_file)
-                except:
-                    pass
+            if time.time() - mtime > max_age:
+                with contextlib.suppress(OSError):
+                    os.unlink(cache_file)
                 return None
 
-            with open(cache_file, "r", encoding="utf-8") as f:
-                cache_data = json.load(f)
-                return cache_data.get("data")
+            with open(cache_file, "rb") as f:
+                cache_data = _json_loads(f.read())
+            data = cache_data.get("data")
+            return (mtime, data) if data is not None else None
         except Exception as e:
-            logger.debug(f"读取缓存失败: {e}")
+            logger.debug("读取缓存失败: %s", e)
             return None
 
+    def _fill_from_disk(
+        self, mem_key: Tuple[str, str, str], entry: Optional[Tuple[float, Dict]]
+    ) -> Optional[Dict]:
+        """磁盘命中后回填内存缓存"""
+        if entry is None:
+            return None
+        self._mem_put(mem_key, *entry)
+        return entry[1]
+
+    async def get_cache_async(
+        self, url: str, path: str, user_id: str, max_age: int = 300
+    ) -> Optional[Dict]:
+        """获取缓存（异步版本，内存未命中时在线程池中读取磁盘）"""
+        mem_key = (url, path, user_id)
+        data = self._mem_get(mem_key, max_age)
+        if data is not None:
+            return data
+        cache_key = self._get_cache_key(url, path, user_id)
+        # 等待该文件尚未完成的后台写入/删除，避免读到失效前的旧内容
+        pending = self._disk_ops.get(self._get_cache_file(cache_key))
+        if pending is not None:
+            await asyncio.wait((pending,))
+        entry = await asyncio.to_thread(self._disk_get, cache_key, max_age)
+        return self._fill_from_disk(mem_key, entry)
+
     def set_cache(self, url: str, path: str, user_id: str, data: Dict):
         """设置缓存"""
         try:
             cache_key = self._get_cache_key(url, path, user_id)
             cache_file = self._get_cache_file(cache_key)
 
-            cache_data = {"timestamp": time.time(), "data": data}
+            timestamp = time.time()
+            cache_data = {"timestamp": timestamp, "data": data}
+            self._mem_put((url, path, user_id), timestamp, data)
 
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # 磁盘写入放到线程池后台执行，不阻塞当前请求
+            self._schedule_disk(cache_file, self._write_disk, cache_data)
         except Exception as e:
-            logger.debug(f"写入缓存失败: {e}")
+            logger.debug("写入缓存失败: %s", e)
+
+    def invalidate(self, url: str, path: str, user_id: str):
+        """使指定目录的缓存失效（目录内容被修改后调用）"""
+        self._mem_cache.pop((url, path, user_id), None)
+        cache_file = self._get_cache_file(self._get_cache_key(url, path, user_id))
+        # 与 set_cache 走同一队列：删除排在之前的写入之后、随后的刷新写入之前
+        self._schedule_disk(cache_file, self._remove_disk)
+
+    def _remove_disk_matching(self, prefix: str):
+        """删除文件名以指定前缀开头的磁盘缓存文件"""
+        with os.scandir(self.cache_dir) as it:
+            paths = [
+                e.path
+                for e in it
+                if e.name.endswith(".json") and e.name.startswith(prefix)
+            ]
+        for path in paths:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
 
-    def clear_cache(self, user_id: str = None):
+    async def clear_cache(self, user_id: str = None):
         """清理缓存"""
         try:
             if user_id:
-                # 清理指定用户的缓存
-                for filename in os.listdir(self.cache_dir):
-                    if filename.endswith(".json"):
-                        cache_key = filename[:-5]  # 移除.json
-                        # 简单检查缓存键是否包含用户ID（通过MD5不完美但够用）
-                        test_key = self._get_cache_key("test", "test", user_id)
-                        if user_id in test_key or cache_key.startswith(test_key[:8]):
-                            try:
-                                os.remove(os.path.join(self.cache_dir, filename))
-                            except:
-                                pass
+                # 清理指定用户的缓存（缓存文件名以用户前缀开头）
+                prefix = f"{self._get_user_prefix(user_id)}_"
+                for mem_key in [k for k in self._mem_cache if k[2] == user_id]:
+                    del self._mem_cache[mem_key]
             else:
-                # 清理所有缓存
-                for filename in os.listdir(self.cache_dir):
-                    if filename.endswith(".json"):
-                        try:
-                            os.remove(os.path.join(self.cache_dir, filename))
-                        except:
-                            pass
+                prefix = ""
+                self._mem_cache.clear()
+
+            # 先等待已排队的写入落盘，否则它们可能在删除之后重新生成旧缓存文件
+            pending = [
+                task
+                for cache_file, task in self._disk_ops.items()
+                if os.path.basename(cache_file).startswith(prefix)
+            ]
+            if pending:
+                await asyncio.wait(pending)
+
+            await asyncio.to_thread(self._remove_disk_matching, prefix)
         except Exception as e:
-            logger.debug(f"清理缓存失败: {e}")
+            logger.debug("清理缓存失败: %s", e)
 
 
 class GlobalConfigManager:
@@ -377,25 +877,23 @@ class GlobalConfigManager:
     def load_config(self) -> Dict:
         """加载全局配置"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    config = json.load(f)
+            config = _read_json_cached(self.config_file)
+            if config is not None:
                 # 合并默认配置
                 merged_config = self.default_config.copy()
                 merged_config.update(config)
                 return merged_config
             return self.default_config.copy()
         except Exception as e:
-            logger.error(f"加载全局配置失败: {e}")
+            logger.error("加载全局配置失败: %s", e)
             return self.default_config.copy()
 
     def save_config(self, config: Dict):
         """保存全局配置"""
         try:
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            _write_json_atomic(self.config_file, config)
         except Exception as e:
-            logger.error(f"保存全局配置失败: {e}")
+            logger.error("保存全局配置失败: %s", e)
 
 
 @register(
@@ -414,6 +912,7 @@ class AlistFilePlugin(Star):
 
         # 插件WebUI配置 (通过_conf_schema.json定义)
         self.config = config
+        self._refresh_webui_settings()
 
         # 全局配置管理器（用于存储用户独立配置等）
         self.global_config_manager = GlobalConfigManager("alistfile")
@@ -422,20 +921,62 @@ class AlistFilePlugin(Star):
         # 缓存管理器
         self.cache_manager = CacheManager("alistfile")
 
-        # 用户导航状态管理 {user_id: {"current_path": str, "items": List[Dict], "parent_paths": List[str]}}
-        self.user_navigation_state = {}
+        # 用户导航状态管理
+        self.user_navigation_state: Dict[str, NavState] = defaultdict(NavState)
 
-        # 用户上传状态管理 {user_id: {"waiting": bool, "target_path": str}}
-        self.user_upload_state = {}
+        # 用户上传状态管理
+        self.user_upload_state: Dict[str, UploadState] = defaultdict(UploadState)
+        # 上传模式自动取消定时器 {用户ID: 定时器}
+        self._upload_timers: Dict[str, asyncio.TimerHandle] = {}
+
+        # 共享的HTTP会话，在 initialize 中创建，terminate 时关闭
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # 按连接凭据缓存的Alist客户端 {凭据: (最近使用时间, 客户端)}，复用已登录的token
+        self._client_cache: "OrderedDict[Credentials, Tuple[float, AlistClient]]" = (
+            OrderedDict()
+        )
+
+        # 进行中的列目录请求 {(url, path, user_id): 任务}，合并同一目录的并发请求
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+
+        # 限制同时发往Alist的请求数，避免连接耗尽或触发服务端限流
+        self._api_sem = asyncio.Semaphore(
+            self.get_webui_config(
+                "max_concurrent_api_calls", DEFAULT_MAX_CONCURRENT_API_CALLS
+            )
+        )
+
+    def _refresh_webui_settings(self):
+        """缓存WebUI全局设置分组，避免每次读取配置项都逐层查找"""
+        self._webui_settings = (
+            self.config.get("global_settings", {}) if self.config else {}
+        )
+        # 命令热路径上频繁使用的设置，预先取出
+        self._enable_cache = self.get_webui_config("enable_cache", True)
+        self._cache_duration = self.get_webui_config("cache_duration", 300)
+        self._max_display_files = self.get_webui_config("max_display_files", 20)
+        self._max_upload_size_mb = self.get_webui_config("max_upload_size", 100)
+        self._max_upload_size_bytes = self._max_upload_size_mb * _MB
 
     def get_webui_config(self, key: str, default=None):
         """获取WebUI配置项"""
-        if self.config:
-            return self.config.get("global_settings", {}).get(key, default)
-        return default
+        return self._webui_settings.get(key, default)
 
     async def initialize(self):
         """插件初始化"""
+        self._refresh_webui_settings()
+
+        # 所有Alist请求复用同一个连接池，避免每条命令重新建立TCP/TLS连接
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=64,
+                limit_per_host=16,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True,
+            )
+        )
         logger.info("Alist文件管理插件已加载")
         default_url = self.get_webui_config("default_alist_url", "")
         require_auth = self.get_webui_config("require_user_auth", True)
@@ -451,7 +992,7 @@ class AlistFilePlugin(Star):
             self.user_config_managers[user_id] = UserConfigManager("alistfile", user_id)
         return self.user_config_managers[user_id]
 
-    def get_user_config(self, user_id: str) -> Dict:
+    async def get_user_config(self, user_id: str) -> Dict:
         """获取用户配置，如果用户未配置则使用全局配置"""
         # 从WebUI获取配置
         require_user_auth = self.get_webui_config("require_user_auth", True)
@@ -469,7 +1010,7 @@ class AlistFilePlugin(Star):
         if require_user_auth:
             # 需要用户认证，使用用户独立配置
             user_manager = self.get_user_config_manager(user_id)
-            user_config = user_manager.load_config()
+            user_config = await user_manager.load_config_async()
 
             # 如果用户未配置，使用WebUI设置的默认值
             if not user_config.get("alist_url") and default_alist_url:
@@ -489,12 +1030,12 @@ class AlistFilePlugin(Star):
                 else allowed_extensions
             )
             user_config["enable_preview"] = enable_preview
-
-            return user_config
+            # 驻留服务器地址，作为缓存键的一部分时哈希与比较更快
+            user_config["alist_url"] = sys.intern(user_config.get("alist_url") or "")
         else:
             # 不需要用户认证，使用全局配置
-            return {
-                "alist_url": default_alist_url,
+            user_config = {
+                "alist_url": sys.intern(default_alist_url),
                 "username": default_username,
                 "password": default_password,
                 "token": default_token,
@@ -505,74 +1046,137 @@ class AlistFilePlugin(Star):
                 "enable_preview": enable_preview,
             }
 
+        return user_config
+
+    def _get_client(self, user_config: Dict) -> AlistClient:
+        """获取（或创建）与用户连接配置对应的Alist客户端
+
+        相同服务器和凭据的命令共享同一个客户端，登录得到的token可跨命令复用；
+        长时间未使用的客户端会被淘汰。
+        """
+        key = _credentials_for(user_config)
+        now = time.monotonic()
+
+        # 淘汰闲置过久的客户端（按最近使用顺序排列，从最旧的开始检查）
+        while self._client_cache:
+            oldest_key, (last_used, _) = next(iter(self._client_cache.items()))
+            if now - last_used < CLIENT_IDLE_TTL:
+                break
+            del self._client_cache[oldest_key]
+
+        entry = self._client_cache.get(key)
+        if entry:
+            client = entry[1]
+        else:
+            client = AlistClient(*key, session=self._session, semaphore=self._api_sem)
+        self._client_cache[key] = (now, client)
+        self._client_cache.move_to_end(key)
+        while len(self._client_cache) > CLIENT_CACHE_SIZE:
+            self._client_cache.popitem(last=False)
+        return client
+
+    async def _fetch_file_list(
+        self, client: AlistClient, key: Tuple[str, str, str]
+    ) -> Optional[Dict]:
+        """从API获取目录列表并写入缓存"""
+        result = await client.list_files(key[1])
+        if result is not None and self._enable_cache:
+            self.cache_manager.set_cache(*key, result)
+        return result
+
+    @staticmethod
+    def _finish_task(task: asyncio.Task):
+        """收尾后台任务：未完成则取消，已完成则取走异常，避免出现未取回异常的警告"""
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+    async def _list_files_shared(
+        self, client: AlistClient, key: Tuple[str, str, str]
+    ) -> Optional[Dict]:
+        """获取目录列表，同一用户对同一目录的并发请求只发起一次API调用"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_file_list(client, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 某个等待者被取消时不影响其他等待同一结果的命令
+        return await asyncio.shield(task)
+
     def _validate_config(self, user_config: Dict) -> bool:
         """验证配置"""
         return bool(user_config.get("alist_url"))
 
-    def _get_user_navigation_state(self, user_id: str) -> Dict:
+    def _get_user_navigation_state(self, user_id: str) -> NavState:
         """获取用户导航状态"""
-        if user_id not in self.user_navigation_state:
-            self.user_navigation_state[user_id] = {
-                "current_path": "/",
-                "items": [],
-                "parent_paths": [],
-            }
         return self.user_navigation_state[user_id]
 
-    def _update_user_navigation_state(self, user_id: str, path: str, items: List[Dict]):
+    def _update_navigation_state(
+        self, nav_state: NavState, path: str, items: List[Dict]
+    ):
         """更新用户导航状态"""
-        nav_state = self._get_user_navigation_state(user_id)
-
         # 如果是新路径，保存到历史
-        if path != nav_state["current_path"]:
+        if path != nav_state.current_path:
             # 只有在前进时才保存当前路径到历史
-            if self._is_forward_navigation(nav_state["current_path"], path):
-                nav_state["parent_paths"].append(nav_state["current_path"])
+            if self._is_forward_navigation(nav_state.current_path, path):
+                nav_state.parent_paths.append(nav_state.current_path)
 
-            nav_state["current_path"] = path
+            nav_state.current_path = path
 
-        nav_state["items"] = items
+        nav_state.items = items
 
     def _is_forward_navigation(self, current_path: str, new_path: str) -> bool:
         """判断是否是前进导航（进入子目录）"""
-        # 标准化路径
-        current = current_path.rstrip("/")
-        new = new_path.rstrip("/")
+        # 当前在根目录时，任何绝对路径都是前进
+        current = _strip_trailing_slash(current_path)
+        if current == "/":
+            return new_path.startswith("/")
 
         # 如果新路径以当前路径开头，且比当前路径长，则认为是前进
-        return new.startswith(current + "/") if current != "/" else new.startswith("/")
+        return _strip_trailing_slash(new_path).startswith(current + "/")
 
-    def _get_item_by_number(self, user_id: str, number: int) -> Optional[Dict]:
+    def _get_item_by_number(self, nav_state: NavState, number: int) -> Optional[Dict]:
         """根据序号获取文件/目录项"""
-        nav_state = self._get_user_navigation_state(user_id)
-        if 1 <= number <= len(nav_state["items"]):
-            return nav_state["items"][number - 1]
+        if 1 <= number <= len(nav_state.items):
+            return nav_state.items[number - 1]
         return None
 
-    def _get_user_upload_state(self, user_id: str) -> Dict:
+    def _get_user_upload_state(self, user_id: str) -> UploadState:
         """获取用户上传状态"""
-        if user_id not in self.user_upload_state:
-            self.user_upload_state[user_id] = {"waiting": False, "target_path": "/"}
         return self.user_upload_state[user_id]
 
     def _set_user_upload_waiting(
         self, user_id: str, waiting: bool, target_path: str = "/"
     ):
-        """设置用户上传等待状态"""
+        """设置用户上传等待状态，进入上传模式时重新开始自动取消计时"""
         upload_state = self._get_user_upload_state(user_id)
-        upload_state["waiting"] = waiting
-        upload_state["target_path"] = target_path
+        upload_state.waiting = waiting
+        upload_state.target_path = target_path
+
+        # 取消之前的定时器，重复进入上传模式时不会累积
+        timer = self._upload_timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        if waiting:
+            self._upload_timers[user_id] = asyncio.get_running_loop().call_later(
+                UPLOAD_WAIT_TIMEOUT, self._auto_cancel_upload, user_id
+            )
+
+    def _auto_cancel_upload(self, user_id: str):
+        """上传模式超时后自动取消"""
+        self._upload_timers.pop(user_id, None)
+        if self._get_user_upload_state(user_id).waiting:
+            self._set_user_upload_waiting(user_id, False)
+            # 注意：定时器回调中无法发送消息给用户，只记录日志
+            logger.info("用户 %s 上传模式已自动取消（超时10分钟）", user_id)
 
     def _format_file_size(self, size: int) -> str:
         """格式化文件大小"""
-        if size < 1024:
-            return f"{size}B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f}KB"
-        elif size < 1024 * 1024 * 1024:
-            return f"{size / (1024 * 1024):.1f}MB"
-        else:
-            return f"{size / (1024 * 1024 * 1024):.1f}GB"
+        # 目录等大小为0的条目最常见，直接返回，不进入缓存查找
+        if not size:
+            return _ZERO_SIZE
+        return _format_size(size)
 
     def _format_file_list(
         self,
@@ -585,7 +1189,7 @@ class AlistFilePlugin(Star):
         if not files:
             return f"📁 {current_path}\n\n❌ 目录为空"
 
-        result = f"📁 {current_path}\n\n"
+        parts = [f"📁 {current_path}\n\n"]
 
         # 分类显示：先目录，后文件
         dirs = [f for f in files if f.get("is_dir", False)]
@@ -593,75 +1197,67 @@ class AlistFilePlugin(Star):
 
         # 合并所有项目（目录在前，文件在后）
         all_items = dirs + files_only
-        max_files = user_config.get("max_display_files", 20)
+        max_files = self._max_display_files
+        display_items = (
+            all_items if len(all_items) <= max_files else all_items[:max_files]
+        )
 
         # 更新用户导航状态
-        if user_id:
-            self._update_user_navigation_state(
-                user_id, current_path, all_items[:max_files]
-            )
+        nav_state = self._get_user_navigation_state(user_id) if user_id else None
+        if nav_state is not None:
+            self._update_navigation_state(nav_state, current_path, display_items)
 
         # 显示项目（带序号）
-        for i, item in enumerate(all_items[:max_files], 1):
+        for i, item in enumerate(display_items, 1):
             name = item.get("name", "")
-            size = item.get("size", 0)
             modified = item.get("modified", "")
-            is_dir = item.get("is_dir", False)
 
             if modified:
                 modified = modified.split("T")[0]  # 只显示日期部分
 
             # 选择图标
-            if is_dir:
-                icon = "📂"
-                result += f"{i:2d}. {icon} {name}/\n"
+            if item.get("is_dir", False):
+                parts.append(f"{i:2d}. {_DIR_ICON} {name}/\n")
                 if modified:
-                    result += f"     📅 {modified}\n"
+                    parts.append(f"     📅 {modified}\n")
             else:
                 # 文件图标
                 ext = os.path.splitext(name)[1].lower()
-                if ext in [".jpg", ".jpeg", ".png", ".gif", ".bmp"]:
-                    icon = "🖼️"
-                elif ext in [".mp4", ".avi", ".mkv", ".mov"]:
-                    icon = "🎬"
-                elif ext in [".mp3", ".wav", ".flac", ".aac"]:
-                    icon = "🎵"
-                elif ext in [".pdf"]:
-                    icon = "📄"
-                elif ext in [".doc", ".docx"]:
-                    icon = "📝"
-                elif ext in [".zip", ".rar", ".7z"]:
-                    icon = "📦"
-                else:
-                    icon = "📄"
-
-                result += f"{i:2d}. {icon} {name}\n"
-                result += f"     💾 {self._format_file_size(size)}"
+                icon = _EXT_ICON.get(ext, _DEFAULT_FILE_ICON)
+                size_str = self._format_file_size(item.get("size", 0))
                 if modified:
-                    result += f" | 📅 {modified}"
-                result += "\n"
+                    parts.append(
+                        f"{i:2d}. {icon} {name}\n     💾 {size_str} | 📅 {modified}\n"
+                    )
+                else:
+                    parts.append(f"{i:2d}. {icon} {name}\n     💾 {size_str}\n")
 
         total_items = len(all_items)
-        displayed_items = min(total_items, max_files)
+        displayed_items = len(display_items)
 
         if total_items > displayed_items:
-            result += f"\n... 还有 {total_items - displayed_items} 个项目未显示"
+            parts.append(f"\n... 还有 {total_items - displayed_items} 个项目未显示")
 
-        result += f"\n📊 总计: {len(dirs)} 个目录, {len(files_only)} 个文件"
+        parts.append(f"\n📊 总计: {len(dirs)} 个目录, {len(files_only)} 个文件")
 
         # 添加导航提示
-        result += f"\n\n💡 快速导航:"
-        result += f"\n   • /alist ls <序号> - 进入对应项目"
-        result += f"\n   • /alist quit - 返回上级目录"
-        if user_id:
-            nav_state = self._get_user_navigation_state(user_id)
-            if nav_state["parent_paths"]:
-                result += f"\n   • 当前可回退 {len(nav_state['parent_paths'])} 级"
+        parts.append(
+            "\n\n💡 快速导航:"
+            "\n   • /alist ls <序号> - 进入对应项目"
+            "\n   • /alist quit - 返回上级目录"
+        )
+        if nav_state is not None:
+            if nav_state.parent_paths:
+                parts.append(f"\n   • 当前可回退 {len(nav_state.parent_paths)} 级")
 
-        return result
+        return "".join(parts)
 
     async def _download_file(
-        self, event: AstrMessageEvent, file_item: Dict, user_config: Dict
+        self,
+        event: AstrMessageEvent,
+        file_item: Dict,
+        user_config: Dict,
+        nav_state: NavState,
     ):
         """下载文件并发送给用户"""
         user_id = event.get_sender_id()
@@ -680,116 +1276,172 @@ class AlistFilePlugin(Star):
 
         try:
             # 获取当前路径
-            nav_state = self._get_user_navigation_state(user_id)
-            current_path = nav_state["current_path"]
+            current_path = nav_state.current_path
             if current_path.endswith("/"):
                 file_path = f"{current_path}{file_name}"
             else:
                 file_path = f"{current_path}/{file_name}"
 
             # 获取下载链接
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                download_url = await client.get_download_url(file_path)
-                if not download_url:
-                    yield event.plain_result("❌ 无法获取下载链接")
-                    return
+            client = self._get_client(user_config)
+            download_url = await client.get_download_url(file_path)
+            if not download_url:
+                yield event.plain_result("❌ 无法获取下载链接")
+                return
 
-                # 创建临时文件
-                downloads_dir = os.path.join(
-                    get_astrbot_data_path(), "plugins_data", "alistfile", "downloads"
-                )
-                os.makedirs(downloads_dir, exist_ok=True)
-
-                # 使用安全的文件名
-                safe_filename = "".join(
-                    c for c in file_name if c.isalnum() or c in "._- "
-                )[:100]
-                temp_file_path = os.path.join(
-                    downloads_dir, f"{user_id}_{int(time.time())}_{safe_filename}"
-                )
+            # 创建临时文件
+            downloads_dir = os.path.join(
+                get_astrbot_data_path(), "plugins_data", "alistfile", "downloads"
+            )
+            os.makedirs(downloads_dir, exist_ok=True)
 
-                # 开始下载
-                yield event.plain_result(
-                    f"📥 开始下载: {file_name}\n💾 大小: {self._format_file_size(file_size)}"
-                )
+            # 使用安全的文件名
+            safe_filename = "".join(c for c in file_name if c.isalnum() or c in "._- ")[
+                :100
+            ]
+            temp_file_path = os.path.join(
+                downloads_dir, f"{user_id}_{int(time.time())}_{safe_filename}"
+            )
 
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(download_url) as response:
-                        if response.status == 200:
-                            with open(temp_file_path, "wb") as f:
-                                downloaded = 0
-                                async for chunk in response.content.iter_chunked(8192):
-                                    f.write(chunk)
-                                    downloaded += len(chunk)
-
-                                    # 每下载10MB报告一次进度 (对于大文件)
-                                    if (
-                                        file_size > 10 * 1024 * 1024
-                                        and downloaded % (10 * 1024 * 1024) < 8192
-                                    ):
-                                        progress = (downloaded / file_size) * 100
-                                        yield event.plain_result(
-                                            f"📥 下载进度: {progress:.1f}% ({self._format_file_size(downloaded)}/{self._format_file_size(file_size)})"
-                                        )
-
-                            # 下载完成，发送文件
-                            yield event.plain_result(f"✅ 下载完成，正在发送文件...")
-
-                            # 发送文件消息组件
-                            file_component = File(name=file_name, file=temp_file_path)
-                            yield event.chain_result([file_component])
-
-                            # 清理临时文件 (延迟删除)
-                            async def cleanup_file():
-                                await asyncio.sleep(10)  # 等待10秒后删除
-                                try:
-                                    if os.path.exists(temp_file_path):
-                                        os.remove(temp_file_path)
-                                except:
-                                    pass
-
-                            asyncio.create_task(cleanup_file())
-
-                        else:
-                            yield event.plain_result(
-                                f"❌ 下载失败: HTTP {response.status}"
-                            )
+            # 开始下载
+            yield event.plain_result(
+                f"📥 开始下载: {file_name}\n💾 大小: {self._format_file_size(file_size)}"
+            )
+
+            async with self._session.get(download_url) as response:
+                if response.status == 200:
+                    # 列表中的大小可能过期或为0，以响应头中的实际长度为准，超限时不读取响应体
+                    content_length = response.content_length or 0
+                    if content_length > max_download_size:
+                        size_mb = content_length / (1024 * 1024)
+                        yield event.plain_result(
+                            f"❌ 文件过大: {size_mb:.1f}MB > {max_download_size_mb}MB\n💡 请使用下载链接命令获取链接"
+                        )
+                        return
+                    if content_length:
+                        file_size = content_length
+
+                    too_large = False
+                    async with aiofiles.open(temp_file_path, "wb") as f:
+                        downloaded = 0
+                        last_reported = 0
+                        async for chunk in response.content.iter_chunked(
+                            DOWNLOAD_CHUNK_SIZE
+                        ):
+                            # 响应头未给出长度（如chunked传输）时，按实际读取量限制大小
+                            downloaded += len(chunk)
+                            if downloaded > max_download_size:
+                                too_large = True
+                                break
+                            await f.write(chunk)
+
+                            # 每下载10MB报告一次进度 (对于大文件)
+                            if (
+                                file_size > DOWNLOAD_PROGRESS_STEP
+                                and downloaded - last_reported >= DOWNLOAD_PROGRESS_STEP
+                            ):
+                                last_reported = downloaded
+                                progress = (downloaded / file_size) * 100
+                                yield event.plain_result(
+                                    f"📥 下载进度: {progress:.1f}% ({self._format_file_size(downloaded)}/{self._format_file_size(file_size)})"
+                                )
+
+                    if too_large:
+                        with contextlib.suppress(OSError):
+                            await asyncio.to_thread(os.remove, temp_file_path)
+                        # 只读取了部分内容，实际大小未知，只提示超过限制
+                        yield event.plain_result(
+                            f"❌ 文件超过 {max_download_size_mb}MB\n💡 请使用下载链接命令获取链接"
+                        )
+                        return
+
+                    # 下载完成，发送文件
+                    yield event.plain_result(f"✅ 下载完成，正在发送文件...")
+
+                    # 发送文件消息组件
+                    file_component = File(name=file_name, file=temp_file_path)
+                    yield event.chain_result([file_component])
+
+                    # 清理临时文件 (延迟删除)
+                    async def cleanup_file():
+                        await asyncio.sleep(10)  # 等待10秒后删除
+                        try:
+                            if os.path.exists(temp_file_path):
+                                os.remove(temp_file_path)
+                        except:
+                            pass
+
+                    asyncio.create_task(cleanup_file())
+
+                else:
+                    yield event.plain_result(f"❌ 下载失败: HTTP {response.status}")
 
         except Exception as e:
-            logger.error(f"用户 {user_id} 下载文件失败: {e}")
+            logger.exception("用户 %s 下载文件失败: %s", user_id, e)
             yield event.plain_result(f"❌ 下载失败: {str(e)}")
 
+    async def _after_upload(
+        self,
+        event: AstrMessageEvent,
+        client: AlistClient,
+        user_config: Dict,
+        user_id: str,
+        target_path: str,
+        success_text: str,
+    ):
+        """上传成功后的收尾：提示成功、退出上传模式并刷新目标目录"""
+        # 目录内容已变化，旧缓存失效；刷新结果会重新写入缓存，
+        # 先发起目录刷新请求，与发送成功提示并行进行
+        cache_key = (user_config["alist_url"], target_path, user_id)
+        self.cache_manager.invalidate(*cache_key)
+        refresh_task = asyncio.create_task(self._fetch_file_list(client, cache_key))
+        try:
+            yield event.plain_result(success_text)
+
+            # 清理上传状态
+            self._set_user_upload_waiting(user_id, False)
+
+            # 刷新当前目录显示
+            result = await refresh_task
+            if result:
+                files = result.get("content", [])
+                formatted_list = self._format_file_list(
+                    files, target_path, user_config, user_id
+                )
+                yield event.plain_result(f"📁 当前目录已更新:\n\n{formatted_list}")
+        finally:
+            # 生成器可能在 yield 处被关闭，确保刷新任务不会被遗弃
+            self._finish_task(refresh_task)
+
     async def _upload_file(
-        self, event: AstrMessageEvent, file_component: File, user_config: Dict
+        self,
+        event: AstrMessageEvent,
+        file_component: File,
+        user_config: Dict,
+        upload_state: UploadState,
     ):
         """上传文件到Alist"""
         user_id = event.get_sender_id()
-        upload_state = self._get_user_upload_state(user_id)
-        target_path = upload_state["target_path"]
+        target_path = upload_state.target_path
 
         try:
             # 获取文件信息
             file_name = file_component.name
             file_path = await file_component.get_file()
 
-            if not file_path or not os.path.exists(file_path):
+            try:
+                file_size = os.stat(file_path).st_size if file_path else None
+            except FileNotFoundError:
+                file_size = None
+            if file_size is None:
                 yield event.plain_result("❌ 无法获取文件，请重新发送")
                 return
 
-            file_size = os.path.getsize(file_path)
-
             # 检查文件大小限制 (默认100MB)
-            max_upload_size_mb = self.get_webui_config("max_upload_size", 100)
-            max_upload_size = max_upload_size_mb * 1024 * 1024
-            if file_size > max_upload_size:
-                size_mb = file_size / (1024 * 1024)
+            if file_size > self._max_upload_size_bytes:
+                size_mb = file_size / _MB
                 yield event.plain_result(
-                    f"❌ 文件过大: {size_mb:.1f}MB > {max_upload_size_mb}MB"
+                    f"❌ 文件过大: {size_mb:.1f}MB > {self._max_upload_size_mb}MB"
                 )
                 return
 
@@ -798,77 +1450,65 @@ class AlistFilePlugin(Star):
                 f"📤 开始上传: {file_name}\n💾 大小: {self._format_file_size(file_size)}\n📂 目标: {target_path}"
             )
 
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                success = await client.upload_file(file_path, target_path, file_name)
+            client = self._get_client(user_config)
+            success = await client.upload_file(
+                file_path, target_path, file_name, file_size=file_size
+            )
 
-                if success:
-                    yield event.plain_result(
-                        f"✅ 上传成功!\n📄 文件: {file_name}\n📂 路径: {target_path}"
+            if success:
+                success_text = (
+                    f"✅ 上传成功!\n📄 文件: {file_name}\n📂 路径: {target_path}"
+                )
+                async with contextlib.aclosing(
+                    self._after_upload(
+                        event, client, user_config, user_id, target_path, success_text
                     )
-
-                    # 清理上传状态
-                    self._set_user_upload_waiting(user_id, False)
-
-                    # 刷新当前目录显示
-                    result = await client.list_files(target_path)
-                    if result:
-                        files = result.get("content", [])
-                        formatted_list = self._format_file_list(
-                            files, target_path, user_config, user_id
-                        )
-                        yield event.plain_result(
-                            f"📁 当前目录已更新:\n\n{formatted_list}"
-                        )
-                else:
-                    yield event.plain_result(f"❌ 上传失败，请检查网络连接和权限")
+                ) as results:
+                    async for result in results:
+                        yield result
+            else:
+                yield event.plain_result(f"❌ 上传失败，请检查网络连接和权限")
 
         except Exception as e:
-            logger.error(f"用户 {user_id} 上传文件失败: {e}")
+            logger.exception("用户 %s 上传文件失败: %s", user_id, e)
             yield event.plain_result(f"❌ 上传失败: {str(e)}")
             self._set_user_upload_waiting(user_id, False)
 
     async def _upload_image(
-        self, event: AstrMessageEvent, image_component: Image, user_config: Dict
+        self,
+        event: AstrMessageEvent,
+        image_component: Image,
+        user_config: Dict,
+        upload_state: UploadState,
     ):
         """上传图片到Alist"""
         user_id = event.get_sender_id()
-        upload_state = self._get_user_upload_state(user_id)
-        target_path = upload_state["target_path"]
+        target_path = upload_state.target_path
 
         try:
             # 获取图片文件路径
             image_path = await image_component.convert_to_file_path()
 
-            if not image_path or not os.path.exists(image_path):
+            try:
+                file_size = os.stat(image_path).st_size if image_path else None
+            except FileNotFoundError:
+                file_size = None
+            if file_size is None:
                 yield event.plain_result("❌ 无法获取图片文件，请重新发送")
                 return
 
             # 生成文件名（使用原始扩展名或默认为.jpg）
-            import time
-
             timestamp = int(time.time())
-            if image_path.lower().endswith(
-                (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp")
-            ):
-                ext = os.path.splitext(image_path)[1]
-            else:
+            ext = os.path.splitext(image_path)[1]
+            if ext.lower() not in _IMG_EXTS:
                 ext = ".jpg"
             filename = f"image_{timestamp}{ext}"
 
-            file_size = os.path.getsize(image_path)
-
             # 检查文件大小限制 (默认100MB)
-            max_upload_size_mb = self.get_webui_config("max_upload_size", 100)
-            max_upload_size = max_upload_size_mb * 1024 * 1024
-            if file_size > max_upload_size:
-                size_mb = file_size / (1024 * 1024)
+            if file_size > self._max_upload_size_bytes:
+                size_mb = file_size / _MB
                 yield event.plain_result(
-                    f"❌ 图片过大: {size_mb:.1f}MB > {max_upload_size_mb}MB"
+                    f"❌ 图片过大: {size_mb:.1f}MB > {self._max_upload_size_mb}MB"
                 )
                 return
 
@@ -877,37 +1517,27 @@ class AlistFilePlugin(Star):
                 f"📤 开始上传图片: {filename}\n💾 大小: {self._format_file_size(file_size)}\n📂 目标: {target_path}"
             )
 
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                success = await client.upload_file(image_path, target_path, filename)
+            client = self._get_client(user_config)
+            success = await client.upload_file(
+                image_path, target_path, filename, file_size=file_size
+            )
 
-                if success:
-                    yield event.plain_result(
-                        f"✅ 图片上传成功!\n📄 文件: {filename}\n📂 路径: {target_path}"
+            if success:
+                success_text = (
+                    f"✅ 图片上传成功!\n📄 文件: {filename}\n📂 路径: {target_path}"
+                )
+                async with contextlib.aclosing(
+                    self._after_upload(
+                        event, client, user_config, user_id, target_path, success_text
                     )
-
-                    # 清理上传状态
-                    self._set_user_upload_waiting(user_id, False)
-
-                    # 刷新当前目录显示
-                    result = await client.list_files(target_path)
-                    if result:
-                        files = result.get("content", [])
-                        formatted_list = self._format_file_list(
-                            files, target_path, user_config, user_id
-                        )
-                        yield event.plain_result(
-                            f"📁 当前目录已更新:\n\n{formatted_list}"
-                        )
-                else:
-                    yield event.plain_result(f"❌ 上传失败，请检查网络连接和权限")
+                ) as results:
+                    async for result in results:
+                        yield result
+            else:
+                yield event.plain_result(f"❌ 上传失败，请检查网络连接和权限")
 
         except Exception as e:
-            logger.error(f"用户 {user_id} 上传图片失败: {e}")
+            logger.exception("用户 %s 上传图片失败: %s", user_id, e)
             yield event.plain_result(f"❌ 上传失败: {str(e)}")
             self._set_user_upload_waiting(user_id, False)
 
@@ -941,37 +1571,33 @@ class AlistFilePlugin(Star):
         user_id = event.get_sender_id()
 
         if action == "show":
-            user_config = self.get_user_config(user_id)
-            config_text = f"📋 用户 {event.get_sender_name()} 的配置:\n\n"
-
-            # 隐藏敏感信息
-            safe_config = user_config.copy()
-            if safe_config.get("password"):
-                safe_config["password"] = "***"
-            if safe_config.get("token"):
-                safe_config["token"] = "***"
-
-            for k, v in safe_config.items():
-                if k != "setup_completed":  # 不显示内部状态
-                    config_text += f"🔹 {k}: {v}\n"
+            user_config = await self.get_user_config(user_id)
+            parts = [f"📋 用户 {event.get_sender_name()} 的配置:\n\n"]
+
+            # 隐藏敏感信息，不显示内部状态
+            parts.extend(
+                f"🔹 {k}: {_mask(k, v)}\n"
+                for k, v in user_config.items()
+                if k != "setup_completed"
+            )
 
             # 显示全局配置信息
             require_auth = self.get_webui_config("require_user_auth", True)
             default_url = self.get_webui_config("default_alist_url", "")
 
             if require_auth:
-                config_text += f"\n💡 提示: 当前启用了用户独立配置模式"
+                parts.append("\n💡 提示: 当前启用了用户独立配置模式")
                 if default_url:
-                    config_text += f"\n🌐 默认服务器: {default_url}"
+                    parts.append(f"\n🌐 默认服务器: {default_url}")
             else:
-                config_text += f"\n💡 提示: 当前使用全局配置模式"
+                parts.append("\n💡 提示: 当前使用全局配置模式")
 
-            yield event.plain_result(config_text)
+            yield event.plain_result("".join(parts))
 
         elif action == "setup":
             # 配置向导
             user_manager = self.get_user_config_manager(user_id)
-            user_config = user_manager.load_config()
+            user_config = await user_manager.load_config_async()
 
             setup_text = """🛠️ Alist配置向导
             
@@ -1004,20 +1630,10 @@ class AlistFilePlugin(Star):
                 yield event.plain_result("❌ 请指定配置项值")
                 return
 
-            user_manager = self.get_user_config_manager(user_id)
-            user_config = user_manager.load_config()
-
             # 验证配置项
-            valid_keys = [
-                "alist_url",
-                "username",
-                "password",
-                "token",
-                "max_display_files",
-            ]
-            if key not in valid_keys:
+            if key not in _VALID_CONFIG_KEYS:
                 yield event.plain_result(
-                    f"❌ 未知的配置项: {key}。可用配置项: {', '.join(valid_keys)}"
+                    f"❌ 未知的配置项: {key}。可用配置项: {_VALID_CONFIG_KEYS_STR}"
                 )
                 return
 
@@ -1032,19 +1648,20 @@ class AlistFilePlugin(Star):
                     yield event.plain_result("❌ max_display_files 必须是数字")
                     return
 
-            user_config[key] = value
+            updates = {key: value}
 
             # 如果设置了alist_url，标记为已配置
             if key == "alist_url" and value:
-                user_config["setup_completed"] = True
+                updates["setup_completed"] = True
 
-            user_manager.save_config(user_config)
+            user_manager = self.get_user_config_manager(user_id)
+            await user_manager.update_config_async(updates)
             yield event.plain_result(
                 f"✅ 已为用户 {event.get_sender_name()} 设置 {key} = {value}"
             )
 
         elif action == "test":
-            user_config = self.get_user_config(user_id)
+            user_config = await self.get_user_config(user_id)
 
             if not self._validate_config(user_config):
                 yield event.plain_result(
@@ -1053,23 +1670,18 @@ class AlistFilePlugin(Star):
                 return
 
             try:
-                async with AlistClient(
-                    user_config["alist_url"],
-                    user_config.get("username", ""),
-                    user_config.get("password", ""),
-                    user_config.get("token", ""),
-                ) as client:
-                    files = await client.list_files("/")
-                    if files is not None:
-                        yield event.plain_result("✅ Alist连接测试成功!")
-                    else:
-                        yield event.plain_result("❌ Alist连接失败，请检查配置")
+                client = self._get_client(user_config)
+                files = await client.list_files("/")
+                if files is not None:
+                    yield event.plain_result("✅ Alist连接测试成功!")
+                else:
+                    yield event.plain_result("❌ Alist连接失败，请检查配置")
             except Exception as e:
                 yield event.plain_result(f"❌ 连接测试失败: {str(e)}")
 
         elif action == "clear_cache":
             # 清理用户缓存
-            self.cache_manager.clear_cache(user_id)
+            await self.cache_manager.clear_cache(user_id)
             yield event.plain_result("✅ 已清理您的文件列表缓存")
 
         else:
@@ -1087,7 +1699,7 @@ class AlistFilePlugin(Star):
         示例: /alist ls /movies 或 /alist ls 1
         """
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
 
         if not self._validate_config(user_config):
             yield event.plain_result(
@@ -1097,15 +1709,15 @@ class AlistFilePlugin(Star):
 
         # 检查是否是序号导航
         target_path = path
-        if path.isdigit():
-            number = int(path)
+        number = _parse_index(path)
+        if number is not None:
             nav_state = self._get_user_navigation_state(user_id)
-            item = self._get_item_by_number(user_id, number)
+            item = self._get_item_by_number(nav_state, number)
             if item:
                 if item.get("is_dir", False):
                     # 进入目录
                     item_name = item.get("name", "")
-                    current_path = nav_state["current_path"]
+                    current_path = nav_state.current_path
                     if current_path.endswith("/"):
                         target_path = f"{current_path}{item_name}"
                     else:
@@ -1115,7 +1727,9 @@ class AlistFilePlugin(Star):
                     yield event.plain_result(
                         f"📥 正在准备下载文件: {item.get('name', '')}..."
                     )
-                    async for result in self._download_file(event, item, user_config):
+                    async for result in self._download_file(
+                        event, item, user_config, nav_state
+                    ):
                         yield result
                     return
             else:
@@ -1126,11 +1740,11 @@ class AlistFilePlugin(Star):
 
         try:
             # 检查缓存
-            enable_cache = self.get_webui_config("enable_cache", True)
-            cache_duration = self.get_webui_config("cache_duration", 300)
+            enable_cache = self._enable_cache
+            cache_duration = self._cache_duration
 
             if enable_cache:
-                cached_result = self.cache_manager.get_cache(
+                cached_result = await self.cache_manager.get_cache_async(
                     user_config["alist_url"], target_path, user_id, cache_duration
                 )
                 if cached_result:
@@ -1142,30 +1756,21 @@ class AlistFilePlugin(Star):
                     yield event.plain_result(formatted_list)
                     return
 
-            # 缓存未命中，从API获取
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                result = await client.list_files(target_path)
-                if result is not None:
-                    # 保存到缓存
-                    if enable_cache:
-                        self.cache_manager.set_cache(
-                            user_config["alist_url"], target_path, user_id, result
-                        )
-
-                    files = result.get("content", [])
-                    formatted_list = self._format_file_list(
-                        files, target_path, user_config, user_id
-                    )
-                    yield event.plain_result(formatted_list)
-                else:
-                    yield event.plain_result(f"❌ 无法访问路径: {target_path}")
+            # 缓存未命中，从API获取（结果由 _fetch_file_list 写入缓存）
+            client = self._get_client(user_config)
+            result = await self._list_files_shared(
+                client, (user_config["alist_url"], target_path, user_id)
+            )
+            if result is not None:
+                files = result.get("content", [])
+                formatted_list = self._format_file_list(
+                    files, target_path, user_config, user_id
+                )
+                yield event.plain_result(formatted_list)
+            else:
+                yield event.plain_result(f"❌ 无法访问路径: {target_path}")
         except Exception as e:
-            logger.error(f"用户 {user_id} 列出文件失败: {e}")
+            logger.exception("用户 %s 列出文件失败: %s", user_id, e)
             yield event.plain_result(f"❌ 操作失败: {str(e)}")
 
     @alist_group.command("search")
@@ -1182,7 +1787,7 @@ class AlistFilePlugin(Star):
             return
 
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
 
         if not self._validate_config(user_config):
             yield event.plain_result(
@@ -1191,38 +1796,33 @@ class AlistFilePlugin(Star):
             return
 
         try:
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                files = await client.search_files(keyword, path)
-                if files:
-                    max_files = user_config.get("max_display_files", 20)
-                    result = f"🔍 搜索结果 (关键词: {keyword})\n搜索路径: {path}\n\n"
-
-                    for i, file_item in enumerate(files[:max_files], 1):
-                        name = file_item.get("name", "")
-                        parent = file_item.get("parent", "")
-                        size = file_item.get("size", 0)
-                        is_dir = file_item.get("is_dir", False)
-
-                        icon = "📂" if is_dir else "📄"
-                        result += f"{i}. {icon} {name}\n"
-                        result += f"   📍 {parent}\n"
-                        if not is_dir:
-                            result += f"   💾 {self._format_file_size(size)}\n"
-                        result += "\n"
-
-                    if len(files) > max_files:
-                        result += f"... 还有 {len(files) - max_files} 个结果未显示"
-
-                    yield event.plain_result(result)
-                else:
-                    yield event.plain_result(f"🔍 未找到包含 '{keyword}' 的文件")
+            client = self._get_client(user_config)
+            files = await client.search_files(keyword, path)
+            if files:
+                max_files = self._max_display_files
+                parts = [f"🔍 搜索结果 (关键词: {keyword})\n搜索路径: {path}\n\n"]
+
+                shown = files if len(files) <= max_files else files[:max_files]
+                for i, file_item in enumerate(shown, 1):
+                    name = file_item.get("name", "")
+                    parent = file_item.get("parent", "")
+
+                    if file_item.get("is_dir", False):
+                        parts.append(f"{i}. {_DIR_ICON} {name}\n   📍 {parent}\n\n")
+                    else:
+                        size_str = self._format_file_size(file_item.get("size", 0))
+                        parts.append(
+                            f"{i}. {_DEFAULT_FILE_ICON} {name}\n   📍 {parent}\n   💾 {size_str}\n\n"
+                        )
+
+                if len(files) > max_files:
+                    parts.append(f"... 还有 {len(files) - max_files} 个结果未显示")
+
+                yield event.plain_result("".join(parts))
+            else:
+                yield event.plain_result(f"🔍 未找到包含 '{keyword}' 的文件")
         except Exception as e:
-            logger.error(f"用户 {user_id} 搜索文件失败: {e}")
+            logger.exception("用户 %s 搜索文件失败: %s", user_id, e)
             yield event.plain_result(f"❌ 搜索失败: {str(e)}")
 
     @alist_group.command("info")
@@ -1237,7 +1837,7 @@ class AlistFilePlugin(Star):
             return
 
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
 
         if not self._validate_config(user_config):
             yield event.plain_result(
@@ -1246,47 +1846,43 @@ class AlistFilePlugin(Star):
             return
 
         try:
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                file_info = await client.get_file_info(path)
-                if file_info:
-                    name = file_info.get("name", "")
-                    size = file_info.get("size", 0)
-                    modified = file_info.get("modified", "")
-                    is_dir = file_info.get("is_dir", False)
-                    provider = file_info.get("provider", "")
-
-                    info_text = f"📋 文件信息\n\n"
-                    info_text += f"📄 名称: {name}\n"
-                    info_text += f"📁 类型: {'目录' if is_dir else '文件'}\n"
-                    info_text += f"📍 路径: {path}\n"
-
-                    if not is_dir:
-                        info_text += f"💾 大小: {self._format_file_size(size)}\n"
-
-                    if modified:
-                        info_text += (
-                            f"📅 修改时间: {modified.replace('T', ' ').split('.')[0]}\n"
-                        )
+            client = self._get_client(user_config)
+            file_info = await client.get_file_info(path)
+            if file_info:
+                name = file_info.get("name", "")
+                size = file_info.get("size", 0)
+                modified = file_info.get("modified", "")
+                is_dir = file_info.get("is_dir", False)
+                provider = file_info.get("provider", "")
+
+                parts = [
+                    "📋 文件信息\n\n",
+                    f"📄 名称: {name}\n",
+                    f"📁 类型: {'目录' if is_dir else '文件'}\n",
+                    f"📍 路径: {path}\n",
+                ]
+
+                if not is_dir:
+                    parts.append(f"💾 大小: {self._format_file_size(size)}\n")
 
-                    if provider:
-                        info_text += f"🔗 存储: {provider}\n"
+                if modified:
+                    parts.append(
+                        f"📅 修改时间: {modified.replace('T', ' ').split('.')[0]}\n"
+                    )
 
-                    # 如果是文件且不是目录，提供下载链接
-                    if not is_dir:
-                        download_url = await client.get_download_url(path)
-                        if download_url:
-                            info_text += f"\n🔗 下载链接:\n{download_url}"
+                if provider:
+                    parts.append(f"🔗 存储: {provider}\n")
 
-                    yield event.plain_result(info_text)
-                else:
-                    yield event.plain_result(f"❌ 文件不存在: {path}")
+                # 如果是文件且不是目录，提供下载链接（已确认是文件，无需再次请求）
+                if not is_dir:
+                    download_url = client.build_download_url(path)
+                    parts.append(f"\n🔗 下载链接:\n{download_url}")
+
+                yield event.plain_result("".join(parts))
+            else:
+                yield event.plain_result(f"❌ 文件不存在: {path}")
         except Exception as e:
-            logger.error(f"用户 {user_id} 获取文件信息失败: {e}")
+            logger.exception("用户 %s 获取文件信息失败: %s", user_id, e)
             yield event.plain_result(f"❌ 操作失败: {str(e)}")
 
     @alist_group.command("download")
@@ -1303,7 +1899,7 @@ class AlistFilePlugin(Star):
             return
 
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
 
         if not self._validate_config(user_config):
             yield event.plain_result(
@@ -1313,9 +1909,10 @@ class AlistFilePlugin(Star):
 
         # 检查是否是序号下载
         target_path = path
-        if path.isdigit():
-            number = int(path)
-            item = self._get_item_by_number(user_id, number)
+        number = _parse_index(path)
+        if number is not None:
+            nav_state = self._get_user_navigation_state(user_id)
+            item = self._get_item_by_number(nav_state, number)
             if item:
                 if item.get("is_dir", False):
                     yield event.plain_result(
@@ -1327,7 +1924,9 @@ class AlistFilePlugin(Star):
                     yield event.plain_result(
                         f"📥 正在准备下载文件: {item.get('name', '')}..."
                     )
-                    async for result in self._download_file(event, item, user_config):
+                    async for result in self._download_file(
+                        event, item, user_config, nav_state
+                    ):
                         yield result
                     return
             else:
@@ -1337,34 +1936,27 @@ class AlistFilePlugin(Star):
                 return
 
         try:
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                download_url = await client.get_download_url(target_path)
-                if download_url:
-                    file_info = await client.get_file_info(target_path)
-                    if file_info:
-                        name = file_info.get("name", "")
-                        size = file_info.get("size", 0)
-
-                        result = f"📥 下载链接\n\n"
-                        result += f"📄 文件: {name}\n"
-                        result += f"💾 大小: {self._format_file_size(size)}\n"
-                        result += f"🔗 链接: {download_url}\n\n"
-                        result += "💡 提示: 点击链接即可下载文件"
-
-                        yield event.plain_result(result)
-                    else:
-                        yield event.plain_result(download_url)
-                else:
-                    yield event.plain_result(
-                        f"❌ 无法获取下载链接，文件可能不存在或是目录: {target_path}"
-                    )
+            client = self._get_client(user_config)
+            # 一次文件信息请求即可同时确认是文件并拿到名称和大小
+            file_info = await client.get_file_info(target_path)
+            if file_info and not file_info.get("is_dir", True):
+                download_url = client.build_download_url(target_path)
+                name = file_info.get("name", "")
+                size = file_info.get("size", 0)
+
+                yield event.plain_result(
+                    "📥 下载链接\n\n"
+                    f"📄 文件: {name}\n"
+                    f"💾 大小: {self._format_file_size(size)}\n"
+                    f"🔗 链接: {download_url}\n\n"
+                    "💡 提示: 点击链接即可下载文件"
+                )
+            else:
+                yield event.plain_result(
+                    f"❌ 无法获取下载链接，文件可能不存在或是目录: {target_path}"
+                )
         except Exception as e:
-            logger.error(f"用户 {user_id} 获取下载链接失败: {e}")
+            logger.exception("用户 %s 获取下载链接失败: %s", user_id, e)
             yield event.plain_result(f"❌ 操作失败: {str(e)}")
 
     @alist_group.command("quit")
@@ -1375,7 +1967,7 @@ class AlistFilePlugin(Star):
         注意: 此命令不接受任何参数
         """
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
 
         if not self._validate_config(user_config):
             yield event.plain_result(
@@ -1385,38 +1977,31 @@ class AlistFilePlugin(Star):
 
         nav_state = self._get_user_navigation_state(user_id)
 
-        if not nav_state["parent_paths"]:
+        if not nav_state.parent_paths:
             yield event.plain_result("📂 已经在根目录，无法继续回退")
             return
 
         # 回退到上一级目录
-        previous_path = nav_state["parent_paths"].pop()
+        previous_path = nav_state.parent_paths.pop()
 
         try:
             # 重新加载上级目录
-            async with AlistClient(
-                user_config["alist_url"],
-                user_config.get("username", ""),
-                user_config.get("password", ""),
-                user_config.get("token", ""),
-            ) as client:
-                result = await client.list_files(previous_path)
-                if result is not None:
-                    files = result.get("content", [])
-                    # 直接更新导航状态，不调用_update_user_navigation_state避免重复处理
-                    nav_state["current_path"] = previous_path
-                    nav_state["items"] = files[
-                        : self.get_webui_config("max_display_files", 20)
-                    ]
-
-                    formatted_list = self._format_file_list(
-                        files, previous_path, user_config, user_id
-                    )
-                    yield event.plain_result(f"⬅️ 已返回上级目录\n\n{formatted_list}")
-                else:
-                    yield event.plain_result(f"❌ 无法访问上级目录: {previous_path}")
+            client = self._get_client(user_config)
+            result = await client.list_files(previous_path)
+            if result is not None:
+                files = result.get("content", [])
+                # 直接更新当前路径，不调用_update_navigation_state避免重复处理；
+                # 序号列表由 _format_file_list 按显示顺序写入
+                nav_state.current_path = previous_path
+
+                formatted_list = self._format_file_list(
+                    files, previous_path, user_config, user_id
+                )
+                yield event.plain_result(f"⬅️ 已返回上级目录\n\n{formatted_list}")
+            else:
+                yield event.plain_result(f"❌ 无法访问上级目录: {previous_path}")
         except Exception as e:
-            logger.error(f"用户 {user_id} 回退目录失败: {e}")
+            logger.exception("用户 %s 回退目录失败: %s", user_id, e)
             yield event.plain_result(f"❌ 回退失败: {str(e)}")
 
     @alist_group.command("upload")
@@ -1432,7 +2017,7 @@ class AlistFilePlugin(Star):
         if action == "cancel":
             upload_state = self._get_user_upload_state(user_id)
 
-            if upload_state["waiting"]:
+            if upload_state.waiting:
                 self._set_user_upload_waiting(user_id, False)
                 yield event.plain_result("✅ 已取消上传模式")
             else:
@@ -1440,7 +2025,7 @@ class AlistFilePlugin(Star):
 
         elif not action:
             # 开始上传模式
-            user_config = self.get_user_config(user_id)
+            user_config = await self.get_user_config(user_id)
 
             if not self._validate_config(user_config):
                 yield event.plain_result(
@@ -1450,36 +2035,12 @@ class AlistFilePlugin(Star):
 
             # 获取当前导航状态中的路径
             nav_state = self._get_user_navigation_state(user_id)
-            current_path = nav_state["current_path"]
+            current_path = nav_state.current_path
 
-            # 设置上传等待状态
+            # 设置上传等待状态（同时启动10分钟后自动取消的定时器）
             self._set_user_upload_waiting(user_id, True, current_path)
 
-            upload_text = f"""📤 上传模式已启动
-            
-📂 目标目录: {current_path}
-
-💡 请直接发送文件或图片，系统会自动上传到此目录
-⏰ 上传模式将在10分钟后自动取消
-
-📋 支持的操作:
-• 直接发送文件 - 上传文件
-• 直接发送图片 - 上传图片
-• /alist upload cancel - 取消上传模式
-• /alist ls - 查看当前目录"""
-
-            yield event.plain_result(upload_text)
-
-            # 设置自动取消上传模式的定时器
-            async def auto_cancel_upload():
-                await asyncio.sleep(600)  # 10分钟
-                upload_state = self._get_user_upload_state(user_id)
-                if upload_state["waiting"]:
-                    self._set_user_upload_waiting(user_id, False)
-                    # 注意：这里不能使用yield，因为在异步任务中无法发送消息给用户
-                    logger.info(f"用户 {user_id} 上传模式已自动取消（超时10分钟）")
-
-            asyncio.create_task(auto_cancel_upload())
+            yield event.plain_result(_UPLOAD_MODE_TEMPLATE.format(path=current_path))
 
         else:
             yield event.plain_result(
@@ -1493,105 +2054,62 @@ class AlistFilePlugin(Star):
         upload_state = self._get_user_upload_state(user_id)
 
         # 检查是否在上传模式
-        if not upload_state["waiting"]:
+        if not upload_state.waiting:
             return  # 不在上传模式，忽略文件消息
 
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
         if not self._validate_config(user_config):
             yield event.plain_result("❌ 请先配置Alist连接信息")
             self._set_user_upload_waiting(user_id, False)
             return
 
         # 获取文件或图片组件
-        messages = event.get_messages()
-        file_components = [msg for msg in messages if isinstance(msg, (File, Image))]
+        # 只处理第一个文件/图片（通常消息只包含一个文件），找到即停止
+        file_component = next(
+            (msg for msg in event.get_messages() if isinstance(msg, _UPLOAD_TYPES)),
+            None,
+        )
 
-        if not file_components:
+        if file_component is None:
             yield event.plain_result("❌ 未检测到文件或图片，请重新发送")
             return
 
-        # 处理第一个文件/图片（通常消息只包含一个文件）
-        file_component = file_components[0]
-
         # 根据组件类型调用不同的上传方法
         if isinstance(file_component, Image):
-            async for result in self._upload_image(event, file_component, user_config):
+            async for result in self._upload_image(
+                event, file_component, user_config, upload_state
+            ):
                 yield result
         else:
-            async for result in self._upload_file(event, file_component, user_config):
+            async for result in self._upload_file(
+                event, file_component, user_config, upload_state
+            ):
                 yield result
 
     @alist_group.command("help")
     async def help_command(self, event: AstrMessageEvent):
         """显示帮助信息"""
         user_id = event.get_sender_id()
-        user_config = self.get_user_config(user_id)
+        user_config = await self.get_user_config(user_id)
         is_user_auth_mode = self.get_webui_config("require_user_auth", True)
 
-        help_text = """📚 Alist文件管理插件帮助
-
-🔧 配置命令:
-/alist config show - 显示当前配置
-/alist config setup - 快速配置向导
-/alist config set <key> <value> - 设置配置项
-/alist config test - 测试连接
-/alist config clear_cache - 清理文件缓存
-
-📁 智能导航:
-/alist ls [路径] - 列出文件和目录 (带序号)
-/alist ls <序号> - 进入对应项目或下载文件
-/alist quit - 返回上级目录
-
-🔍 文件操作:
-/alist search <关键词> [路径] - 搜索文件
-/alist info <文件路径> - 查看文件详细信息
-/alist download <路径/序号> - 获取下载链接或直接下载
-
-📤 上传操作:
-/alist upload - 开始上传模式
-/alist upload cancel - 取消上传模式
-(在上传模式下直接发送文件或图片即可上传)
-
-📝 示例:
-/alist config setup (推荐新手使用)
-/alist config set alist_url http://localhost:5244
-/alist ls /movies
-/alist ls 1 (进入1号目录或下载1号文件)
-/alist quit (返回上级目录)
-/alist search movie.mp4
-/alist download 3 (直接下载3号文件)"""
-
+        parts = [_HELP_BASE]
         if is_user_auth_mode:
-            help_text += f"""
-
-👤 用户认证模式:
-- 当前启用了用户独立配置模式
-- 每个用户需要独立配置自己的Alist连接
-- 您的配置不会影响其他用户"""
-
+            parts.append(_HELP_USER_AUTH_SUFFIX)
             if not self._validate_config(user_config):
-                help_text += f"""
-
-⚠️  您尚未配置Alist连接，请使用以下命令开始:
-   /alist config setup"""
+                parts.append(_HELP_UNCONFIGURED_WARN)
         else:
-            help_text += f"""
-
-🌐 全局配置模式:
-- 当前使用全局配置模式
-- 所有用户共享相同的Alist服务器连接
-- 管理员可在WebUI中配置全局设置"""
-
-        help_text += f"""
-
-💡 提示:
-1. 首次使用建议运行 /alist config setup 配置向导
-2. 如果Alist需要登录，请配置用户名和密码
-3. 路径区分大小写，以/开头表示根目录
-4. 管理员可在WebUI插件配置页面调整全局设置"""
+            parts.append(_HELP_GLOBAL_SUFFIX)
+        parts.append(_HELP_TIP)
 
-        yield event.plain_result(help_text)
+        yield event.plain_result("".join(parts))
 
     async def terminate(self):
         """插件销毁时的清理工作"""
+        for timer in self._upload_timers.values():
+            timer.cancel()
+        self._upload_timers.clear()
+        self._client_cache.clear()
+        if self._session and not self._session.closed:
+            await self._session.close()
         logger.info("Alist文件管理插件已卸载")